@@ -1,114 +1,252 @@
 import os
 import logging
+import httpx
+import orjson
+from contextlib import asynccontextmanager
 from typing import Any
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from github import summarize_commits
-from utils import verify_github_signature
-from database import resolve_user_id, store_commits, should_create_post, create_post
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from utils import is_well_formed_signature, create_signature_hmac, verify_github_signature
+from database import resolve_user_id, prepare_commits, store_commits, should_create_post, create_post
 
-# Configure logging
+# Load environment variables
+load_dotenv()
+
+# Configure logging (set LOG_LEVEL=WARNING in production to silence per-request logs)
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(),
     ]
 )
 logger = logging.getLogger(__name__)
-
-# Load environment variables
-load_dotenv()
 logger.info("Environment variables loaded")
 
+# Environment variables
+GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_SECRET_KEY = os.getenv("SUPABASE_SECRET_KEY")
+FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:3000")
+MAX_WEBHOOK_BODY_BYTES = int(os.getenv("MAX_WEBHOOK_BODY_BYTES", 1024 * 1024))
+
+# Encode the webhook secret once instead of on every signature check
+GITHUB_WEBHOOK_SECRET_BYTES = GITHUB_WEBHOOK_SECRET.encode('utf-8') if GITHUB_WEBHOOK_SECRET else b""
+
+# Raw bytes present in every push payload for the main branch, however the JSON is spaced
+MAIN_REF_MARKER = b'"refs/heads/main"'
+
+logger.info("Environment variables loaded - GitHub secret: %s", '***' if GITHUB_WEBHOOK_SECRET else 'NOT SET')
+logger.info("Supabase URL: %s", SUPABASE_URL[:20] + '...' if SUPABASE_URL else 'NOT SET')
+logger.info("Supabase key: %s", '***' if SUPABASE_SECRET_KEY else 'NOT SET')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the pooled HTTP and Supabase clients once and share them across requests"""
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30),
+        timeout=httpx.Timeout(10.0, connect=2.0),
+    ) as http_client:
+        app.state.http = http_client
+        app.state.supabase = await acreate_client(
+            SUPABASE_URL,
+            SUPABASE_SECRET_KEY,
+            options=AsyncClientOptions(httpx_client=http_client),
+        )
+        logger.info("Supabase client initialized")
+        yield
+
+
+def get_supabase(request: Request) -> AsyncClient:
+    """Dependency returning the shared async Supabase client"""
+    return request.app.state.supabase
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Crax Webhook Server")
+app = FastAPI(title="Crax Webhook Server", lifespan=lifespan, default_response_class=ORJSONResponse)
 logger.info("FastAPI application initialized")
 
+
+class WebhookAwareCORSMiddleware(CORSMiddleware):
+    """CORS middleware that lets webhook routes bypass CORS handling entirely"""
+    
+    async def __call__(self, scope, receive, send):
+        # Webhooks are server-to-server calls from GitHub and never need CORS
+        if scope["type"] == "http" and scope["path"].startswith("/webhooks/"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 # Configure CORS
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
+    WebhookAwareCORSMiddleware,
+    allow_origins=[FRONTEND_ORIGIN],
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
 )
 logger.info("CORS middleware configured")
 
-# Environment variables
-GITHUB_WEBHOOK_SECRET = os.getenv("GITHUB_WEBHOOK_SECRET")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SECRET_KEY = os.getenv("SUPABASE_SECRET_KEY")
-
-logger.info(f"Environment variables loaded - GitHub secret: {'***' if GITHUB_WEBHOOK_SECRET else 'NOT SET'}")
-logger.info(f"Supabase URL: {SUPABASE_URL[:20] + '...' if SUPABASE_URL else 'NOT SET'}")
-logger.info(f"Supabase key: {'***' if SUPABASE_SECRET_KEY else 'NOT SET'}")
-
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
-logger.info("Supabase client initialized")
-
 
 @app.get("/")
 async def health_check():
     """Health check endpoint"""
-    logger.info("Health check endpoint accessed")
+    logger.debug("Health check endpoint accessed")
     return {"status": "ok", "service": "crax-webhook-server"}
 
 
+async def process_push(supabase: AsyncClient, user_id: str, commits: list[dict[str, Any]], repository_id: str, repository_name: str, owner_name: str, pushed_at: str) -> None:
+    """
+    Store a push's commits and, if Claude thinks they warrant it, create a post.
+    
+    Runs as a background task after the webhook has been acknowledged, so
+    failures are logged rather than returned to GitHub.
+    """
+    commit_rows = prepare_commits(commits)
+    
+    # Store all commits in the database
+    logger.debug("Storing commits in database")
+    try:
+        unposted_commits = await store_commits(supabase, user_id, commit_rows, repository_id, repository_name, owner_name, pushed_at)
+        logger.debug("Stored %s commits", len(commit_rows))
+    except Exception as e:
+        logger.error("Failed to store commits: %s", e)
+        return
+    
+    if not unposted_commits:
+        logger.info("Push to %s was already processed - skipping evaluation", repository_name)
+        return
+    
+    # Ask Claude whether the recent unposted commits warrant a post, and for the draft if so
+    logger.debug("Evaluating if commits warrant a build update post")
+    commit_ids = [commit["id"] for commit in unposted_commits]
+    try:
+        should_post, reasoning, post_content = await should_create_post([commit["message"] for commit in unposted_commits])
+        logger.debug("AI evaluation result: %s", 'POST' if should_post else 'SKIP')
+        logger.debug("Reasoning: %s", reasoning)
+    except Exception as e:
+        logger.error("Failed to evaluate commits: %s", e)
+        return
+    
+    post_id = None
+    if should_post:
+        # Create the post in Supabase and link commits
+        logger.debug("Creating post in Supabase")
+        try:
+            post = await create_post(supabase, user_id, post_content, commit_ids)
+            post_id = post["id"]
+        except Exception as e:
+            logger.error("Failed to create post: %s", e)
+            return
+    
+    # One summary line per push instead of a log line per step
+    logger.info(
+        "Processed push to %s: %s commits stored, %s unposted, %s",
+        repository_name, len(commit_rows), len(commit_ids),
+        f"post {post_id} created" if post_id else f"no post ({reasoning})",
+        extra={"repository_id": repository_id, "user_id": user_id, "commits": len(commit_rows), "post_id": post_id},
+    )
+
+
 @app.post("/webhooks/github")
-async def github_webhook(request: Request):
+async def github_webhook(request: Request, background_tasks: BackgroundTasks, supabase: AsyncClient = Depends(get_supabase)):
     """
     Handle GitHub push webhook events.
     
-    Verifies the signature, processes commits, and creates a post.
+    Verifies the signature and filters the event, then acknowledges GitHub
+    immediately and processes the commits in the background.
     """
-    logger.info("GitHub webhook received - starting processing")
+    logger.debug("GitHub webhook received - starting processing")
+    
+    # Only push events are processed; skip everything else before touching the body
+    event = request.headers.get("X-GitHub-Event")
+    if event != "push":
+        logger.info("Skipping %s event - only processing push events", event)
+        return {
+            "message": "Skipped - not a push event",
+            "event": event
+        }
     
     # Get the signature from headers
     signature = request.headers.get("X-Hub-Signature-256")
-    logger.info(f"Signature header present: {'Yes' if signature else 'No'}")
+    logger.debug("Signature header present: %s", 'Yes' if signature else 'No')
     
     if not signature:
         logger.error("Missing X-Hub-Signature-256 header")
         raise HTTPException(status_code=400, detail="Missing X-Hub-Signature-256 header")
     
-    # Get the raw body for signature verification
-    body = await request.body()
-    logger.info(f"Request body size: {len(body)} bytes")
+    if not is_well_formed_signature(signature):
+        logger.error("Malformed X-Hub-Signature-256 header")
+        raise HTTPException(status_code=400, detail="Invalid signature")
+    
+    # Reject oversized payloads before reading the body
+    try:
+        content_length = int(request.headers.get("content-length", "0"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+    
+    if content_length > MAX_WEBHOOK_BODY_BYTES:
+        logger.warning("Rejecting webhook payload of %s bytes", content_length)
+        raise HTTPException(status_code=413, detail="Payload too large")
+    
+    # Stream the body, hashing each chunk as it arrives so verification overlaps the upload
+    payload_hmac = create_signature_hmac(GITHUB_WEBHOOK_SECRET_BYTES)
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_WEBHOOK_BODY_BYTES:
+            logger.warning("Rejecting webhook payload larger than %s bytes", MAX_WEBHOOK_BODY_BYTES)
+            raise HTTPException(status_code=413, detail="Payload too large")
+        payload_hmac.update(chunk)
+    logger.debug("Request body size: %s bytes", len(body))
     
     # Verify the signature
-    logger.info("Verifying GitHub signature")
-    if not verify_github_signature(body, signature, GITHUB_WEBHOOK_SECRET):
+    logger.debug("Verifying GitHub signature")
+    if not verify_github_signature(payload_hmac, signature):
         logger.error("GitHub signature verification failed")
         raise HTTPException(status_code=400, detail="Invalid signature")
     
-    logger.info("GitHub signature verified successfully")
+    logger.debug("GitHub signature verified successfully")
+    
+    # Most pushes are to other branches or tags; a byte scan rejects them without a full parse.
+    # Only the value is matched, so any formatting falls through to the authoritative ref check below.
+    if MAIN_REF_MARKER not in body:
+        logger.info("Skipping push - only processing main branch")
+        return {"message": "Skipped - not a push to main branch"}
     
     # Parse the JSON payload
-    logger.info("Parsing JSON payload")
-    payload = await request.json()
-    logger.info(f"Payload keys: {list(payload.keys())}")
+    logger.debug("Parsing JSON payload")
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        logger.error("Failed to parse JSON payload: %s", e)
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload keys: %s", list(payload.keys()))
     
     # Extract repository information
     repository = payload.get("repository", {})
     is_private = repository.get("private", True)
-    logger.info(f"Repository private status: {is_private}")
+    logger.debug("Repository private status: %s", is_private)
     
     # Only process pushes to main branch
     ref = payload.get("ref")
-    logger.info(f"Push reference: {ref}")
+    logger.debug("Push reference: %s", ref)
     
     if ref != "refs/heads/main":
-        logger.info(f"Skipping push to {ref} - only processing main branch")
+        logger.info("Skipping push to %s - only processing main branch", ref)
         return {
             "message": "Skipped - not a push to main branch",
             "ref": ref
         }
     
-    logger.info("Processing push to main branch of repository")
+    logger.debug("Processing push to main branch of repository")
     
     # Extract commits and repository info
     commits = payload.get("commits", [])
@@ -118,10 +256,7 @@ async def github_webhook(request: Request):
     owner_name = repository_owner.get("name", "")
     pushed_at = repository.get("pushed_at", "")
     
-    logger.info(f"Repository: {repository_name} (ID: {repository_id})")
-    logger.info(f"Repository owner: {owner_name}")
-    logger.info(f"Number of commits in push: {len(commits)}")
-    logger.info(f"Pushed at: {pushed_at}")
+    logger.debug("Repository: %s (ID: %s, owner: %s) - %s commits pushed at %s", repository_name, repository_id, owner_name, len(commits), pushed_at)
     
     if not commits:
         logger.warning("No commits found in push event")
@@ -130,92 +265,31 @@ async def github_webhook(request: Request):
     # Resolve user ID from GitHub username
     sender = payload.get("sender", {})
     github_username = sender.get("login")
-    logger.info(f"GitHub username from sender: {github_username}")
+    logger.debug("GitHub username from sender: %s", github_username)
     
     if not github_username:
         logger.error("No GitHub username found in webhook payload")
         raise HTTPException(status_code=400, detail="No GitHub username found in webhook payload")
     
-    logger.info(f"Resolving user ID for GitHub username: {github_username}")
-    user_id = resolve_user_id(supabase, github_username)
+    logger.debug("Resolving user ID for GitHub username: %s", github_username)
+    user_id = await resolve_user_id(supabase, github_username)
     
     if not user_id:
-        logger.error(f"User not found for GitHub username: {github_username}")
+        logger.error("User not found for GitHub username: %s", github_username)
         raise HTTPException(
             status_code=404,
             detail=f"User not found for GitHub username: {github_username}"
         )
     
-    logger.info(f"User ID resolved: {user_id}")
-    
-    # Store all commits in the database
-    logger.info("Storing commits in database")
-    try:
-        commit_ids = store_commits(supabase, user_id, commits, repository_id, repository_name, owner_name, pushed_at)
-        logger.info(f"Stored {len(commit_ids)} commits")
-    except Exception as e:
-        logger.error(f"Failed to store commits: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to store commits: {str(e)}"
-        )
+    logger.debug("User ID resolved: %s", user_id)
     
-    # Check if recent commits warrant a post
-    logger.info("Evaluating if commits warrant a build update post")
-    try:
-        should_post, reasoning = should_create_post(supabase, user_id, repository_id)
-        logger.info(f"AI evaluation result: {'POST' if should_post else 'SKIP'}")
-        logger.info(f"Reasoning: {reasoning}")
-    except Exception as e:
-        logger.error(f"Failed to evaluate commits: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to evaluate commits: {str(e)}"
-        )
+    # Store, evaluate and post after responding so GitHub isn't kept waiting on Claude
+    background_tasks.add_task(process_push, supabase, user_id, commits, repository_id, repository_name, owner_name, pushed_at)
     
-    if not should_post:
-        logger.info("Commits do not warrant a post - skipping post creation")
-        return {
-            "message": "Commits stored but no post created",
-            "reasoning": reasoning,
-            "commits_stored": len(commit_ids)
+    return ORJSONResponse(
+        status_code=202,
+        content={
+            "message": "Push accepted for processing",
+            "commits_received": len(commits)
         }
-    
-    # Generate the post content using Claude
-    logger.info("Generating post content using Claude")
-    commit_messages = [commit.get("message", "") for commit in commits if commit.get("message")]
-    
-    try:
-        post_content = summarize_commits(commit_messages)
-        logger.info(f"Post content generated successfully - length: {len(post_content)} characters")
-        logger.info(f"Generated content: {post_content}")
-    except Exception as e:
-        logger.error(f"Failed to generate post summary: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to generate post summary: {str(e)}"
-        )
-    
-    # Create the post in Supabase and link commits
-    logger.info("Creating post in Supabase")
-    try:
-        post = create_post(supabase, user_id, post_content, commit_ids)
-        logger.info(f"Post created successfully with ID: {post['id']}")
-    except Exception as e:
-        logger.error(f"Failed to create post: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to create post: {str(e)}"
-        )
-    
-    logger.info("GitHub webhook processing completed successfully")
-    
-    return {
-        "message": "Post created successfully",
-        "post_id": post["id"],
-        "content": post_content,
-        "commits_processed": len(commits),
-        "commits_linked": len(commit_ids),
-        "reasoning": reasoning
-    }
-
+    )
@@ -1,149 +1,180 @@
 import logging
 from typing import Any
-from supabase import Client
+from cachetools import TTLCache
+from supabase import AsyncClient
+from github import evaluate_commits
+from utils import convert_timestamp_to_iso
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# GitHub username -> user ID lookups; the mapping rarely changes, so cache it in-process
+_user_id_cache: TTLCache[str, str] = TTLCache(maxsize=10_000, ttl=3600)
+# Usernames with no matching profile, cached briefly so unknown senders can't force a query per request
+_missing_user_cache: TTLCache[str, bool] = TTLCache(maxsize=10_000, ttl=60)
 
-def resolve_user_id(supabase: Client, github_username: str) -> str | None:
+
+def invalidate_user(github_username: str) -> None:
+    """
+    Drop any cached user ID lookup for a GitHub username.
+    
+    Call this when a profile's GitHub URL changes so the next webhook re-queries Supabase.
+    
+    Args:
+        github_username: GitHub username whose cached lookup should be removed
+    """
+    _user_id_cache.pop(github_username, None)
+    _missing_user_cache.pop(github_username, None)
+
+
+async def resolve_user_id(supabase: AsyncClient, github_username: str) -> str | None:
     """
     Resolve GitHub username to Supabase user ID.
     
+    Results are cached in-process (misses for a shorter time than hits).
+    
     Args:
-        supabase: Supabase client instance
+        supabase: Async Supabase client instance
         github_username: GitHub username from the webhook
         
     Returns:
         User ID if found, None otherwise
     """
-    logger.info(f"Resolving user ID for GitHub username: {github_username}")
+    logger.debug("Resolving user ID for GitHub username: %s", github_username)
+    
+    if github_username in _user_id_cache:
+        logger.debug("User ID cache hit for GitHub username: %s", github_username)
+        return _user_id_cache[github_username]
+    
+    if github_username in _missing_user_cache:
+        logger.debug("Missing user cache hit for GitHub username: %s", github_username)
+        return None
     
     # Construct the GitHub URL
     github_url = f"https://github.com/{github_username}"
-    logger.info(f"Constructed GitHub URL: {github_url}")
+    logger.debug("Constructed GitHub URL: %s", github_url)
     
     # Query Supabase for user with matching GitHub URL
-    logger.info("Querying Supabase profiles table for matching GitHub URL")
-    response = supabase.table("profiles").select("id").eq("github_url", github_url).execute()
+    logger.debug("Querying Supabase profiles table for matching GitHub URL")
+    response = await supabase.table("profiles").select("id").eq("github_url", github_url).execute()
     
-    logger.info(f"Supabase query response: {len(response.data) if response.data else 0} results")
+    logger.debug("Supabase query response: %s results", len(response.data) if response.data else 0)
     
     if response.data and len(response.data) > 0:
         user_id = response.data[0]["id"]
-        logger.info(f"Found user ID: {user_id}")
+        logger.debug("Found user ID: %s", user_id)
+        _user_id_cache[github_username] = user_id
         return user_id
     
-    logger.warning(f"No user found for GitHub username: {github_username}")
+    logger.warning("No user found for GitHub username: %s", github_username)
+    _missing_user_cache[github_username] = True
     return None
 
 
-def store_commits(supabase: Client, user_id: str, commits: list[dict], repository_id: str, repository_name: str, owner_name: str, pushed_at: str) -> list[str]:
+def prepare_commits(commits: list[dict]) -> list[dict[str, Any]]:
     """
-    Store commits in the commits table.
+    Build the commit rows for storage in a single pass over the push.
     
     Args:
-        supabase: Supabase client instance
-        user_id: The user ID who made the commits
         commits: List of commit objects from GitHub webhook
-        repository_id: GitHub repository ID
-        repository_name: Repository name
-        owner_name: Repository owner's GitHub username
-        pushed_at: ISO timestamp when the push occurred
         
     Returns:
-        List of commit IDs that were stored
+        Commit rows for store_commits
     """
-    from utils import convert_timestamp_to_iso
-    
-    logger.info(f"Storing {len(commits)} commits for user {user_id}")
-    
-    # Convert pushed_at timestamp to ISO format
-    pushed_at_iso = convert_timestamp_to_iso(pushed_at)
-    logger.info(f"Converted pushed_at: {pushed_at} -> {pushed_at_iso}")
-    
-    commit_data = []
-    for i, commit in enumerate(commits):
-        # Convert commit timestamp to ISO format for PostgreSQL
-        original_timestamp = commit.get("timestamp")
-        committed_at = convert_timestamp_to_iso(original_timestamp)
-        
-        logger.info(f"Commit {i+1}: timestamp {original_timestamp} -> {committed_at}")
-        
-        commit_entry = {
-            "user_id": user_id,
-            "committed_at": committed_at,
-            "pushed_at": pushed_at_iso,
+    return [
+        {
+            # Convert commit timestamp to ISO format for PostgreSQL
+            "committed_at": convert_timestamp_to_iso(commit.get("timestamp")),
             "commit_id": commit.get("id"),
             "message": commit.get("message", ""),
-            "repository_id": repository_id,
-            "repository_name": repository_name,
-            "owner_name": owner_name,
             "added_files": commit.get("added", []),
             "removed_files": commit.get("removed", []),
             "modified_files": commit.get("modified", [])
         }
-        commit_data.append(commit_entry)
+        for commit in commits
+    ]
+
+
+async def store_commits(supabase: AsyncClient, user_id: str, commit_rows: list[dict[str, Any]], repository_id: str, repository_name: str, owner_name: str, pushed_at: str) -> list[dict[str, Any]]:
+    """
+    Store commits in the commits table and fetch the repository's unposted commits.
+    
+    Both steps run inside the process_github_push Postgres function, so the
+    webhook only pays for a single round trip to Supabase.
+    
+    Args:
+        supabase: Async Supabase client instance
+        user_id: The user ID who made the commits
+        commit_rows: Commit rows built by prepare_commits
+        repository_id: GitHub repository ID
+        repository_name: Repository name
+        owner_name: Repository owner's GitHub username
+        pushed_at: ISO timestamp when the push occurred
+        
+    Returns:
+        Up to 10 of the most recent unposted commits for this user and repository
+        (including the ones just stored), each with "id" and "message". Empty if every
+        commit was already stored, i.e. the push is a redelivery.
+    """
+    logger.debug("Storing %s commits for user %s", len(commit_rows), user_id)
     
-    logger.info("Inserting commits into Supabase commits table")
-    response = supabase.table("commits").insert(commit_data).execute()
+    # Convert pushed_at timestamp to ISO format
+    pushed_at_iso = convert_timestamp_to_iso(pushed_at)
+    logger.debug("Converted pushed_at: %s -> %s", pushed_at, pushed_at_iso)
+    
+    logger.debug("Calling process_github_push in Supabase")
+    response = await supabase.rpc("process_github_push", {
+        "p_user_id": user_id,
+        "p_repository_id": repository_id,
+        "p_repository_name": repository_name,
+        "p_owner_name": owner_name,
+        "p_pushed_at": pushed_at_iso,
+        "p_commits": commit_rows,
+    }).execute()
     
     if not response.data:
-        logger.error("Failed to store commits - no data returned from Supabase")
-        raise Exception("Failed to store commits")
+        logger.debug("No new commits stored - push was already processed")
+        return []
     
-    commit_ids = [commit["id"] for commit in response.data]
-    logger.info(f"Successfully stored {len(commit_ids)} commits")
+    logger.debug("Successfully stored %s commits - %s unposted commits found", len(commit_rows), len(response.data))
     
-    return commit_ids
+    return response.data
 
 
-def should_create_post(supabase: Client, user_id: str, repository_id: str) -> tuple[bool, str]:
+async def should_create_post(commit_messages: list[str]) -> tuple[bool, str, str | None]:
     """
-    Use AI to determine if recent commits warrant a build update post.
+    Use AI to determine if recent commits warrant a build update post, drafting it if so.
     
     Args:
-        supabase: Supabase client instance
-        user_id: The user ID
-        repository_id: The repository ID
+        commit_messages: Messages of the recent unposted commits
         
     Returns:
-        Tuple of (should_post, reasoning)
+        Tuple of (should_post, reasoning, post_content); post_content is None when not posting
     """
-    logger.info(f"Checking if commits warrant a post for user {user_id} in repo {repository_id}")
+    logger.debug("Checking if %s commits warrant a post", len(commit_messages))
     
-    # Get recent commits for this user and repository that haven't been posted about yet
-    response = supabase.table("commits").select("*").eq("user_id", user_id).eq("repository_id", repository_id).is_("post_id", "null").order("committed_at", desc=True).limit(10).execute()
-    
-    if not response.data:
-        logger.info("No recent commits found")
-        return False, "No recent commits found"
-    
-    recent_commits = response.data
-    logger.info(f"Found {len(recent_commits)} recent commits to evaluate")
-    
-    # Extract commit messages for AI evaluation
-    commit_messages = [commit["message"] for commit in recent_commits]
+    if not commit_messages:
+        logger.debug("No recent commits found")
+        return False, "No recent commits found", None
     
     try:
-        # Use Claude to determine if this warrants a post
-        from github import should_post_about_commits
-        should_post, reasoning = should_post_about_commits(commit_messages)
+        # Use Claude to decide and draft the post in a single request
+        should_post, reasoning, post_content = await evaluate_commits(commit_messages)
         
-        logger.info(f"AI decision: {'POST' if should_post else 'SKIP'} - {reasoning}")
-        return should_post, reasoning
+        logger.debug("AI decision: %s - %s", 'POST' if should_post else 'SKIP', reasoning)
+        return should_post, reasoning, post_content
         
     except Exception as e:
-        logger.error(f"Error evaluating commits with AI: {str(e)}")
-        return False, f"Error evaluating commits: {str(e)}"
+        logger.error("Error evaluating commits with AI: %s", e)
+        return False, f"Error evaluating commits: {str(e)}", None
 
 
-def create_post(supabase: Client, author_id: str, description: str, commit_ids: list[str]) -> dict[str, Any]:
+async def create_post(supabase: AsyncClient, author_id: str, description: str, commit_ids: list[str]) -> dict[str, Any]:
     """
-    Create a post in Supabase and link it to commits.
+    Create a post in Supabase and link it to commits in a single round trip.
     
     Args:
-        supabase: Supabase client instance
+        supabase: Async Supabase client instance
         author_id: The user ID who authored the post
         description: The post content
         commit_ids: List of commit IDs to link to this post
@@ -151,35 +182,25 @@ def create_post(supabase: Client, author_id: str, description: str, commit_ids:
     Returns:
         The created post data
     """
-    logger.info(f"Creating post for author_id: {author_id}")
-    logger.info(f"Post description length: {len(description)} characters")
-    logger.info(f"Linking {len(commit_ids)} commits to this post")
-    
-    post_data = {
-        "author_id": author_id,
-        "description": description,
-        "type": "push",
-        "image_url": None,
-        "video_url": None,
-    }
+    logger.debug("Creating post for author_id: %s", author_id)
+    logger.debug("Post description length: %s characters", len(description))
+    logger.debug("Linking %s commits to this post", len(commit_ids))
     
-    logger.info("Inserting post data into Supabase posts table")
-    response = supabase.table("posts").insert(post_data).execute()
+    # Insert the post and link its commits atomically via the create_push_post function
+    logger.debug("Calling create_push_post in Supabase")
+    response = await supabase.rpc("create_push_post", {
+        "p_author_id": author_id,
+        "p_description": description,
+        "p_commit_ids": commit_ids,
+    }).execute()
     
-    logger.info(f"Supabase insert response: {len(response.data) if response.data else 0} results")
+    logger.debug("Supabase create_push_post response: %s results", len(response.data) if response.data else 0)
     
     if not response.data:
         logger.error("Failed to create post - no data returned from Supabase")
         raise Exception("Failed to create post")
     
     created_post = response.data[0]
-    post_id = created_post["id"]
-    logger.info(f"Post created successfully with ID: {post_id}")
-    
-    # Link commits to this post
-    if commit_ids:
-        logger.info(f"Linking {len(commit_ids)} commits to post {post_id}")
-        update_response = supabase.table("commits").update({"post_id": post_id}).in_("id", commit_ids).execute()
-        logger.info(f"Updated {len(update_response.data) if update_response.data else 0} commits")
+    logger.debug("Post created successfully with ID: %s", created_post['id'])
     
     return created_post
@@ -1,210 +1,167 @@
 import os
+import hashlib
 import logging
-import json
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+from cachetools import TTLCache
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# Tool Claude is forced to call, so the decision and draft come back as parsed JSON
+DECIDE_TOOL = {
+    "name": "decide",
+    "description": "Record whether the commits warrant a build in public post, and the post itself if they do.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "should_post": {
+                "type": "boolean",
+                "description": "Whether the commits warrant a post",
+            },
+            "reasoning": {
+                "type": "string",
+                "description": "Brief explanation of the decision",
+            },
+            "post_text": {
+                "type": "string",
+                "description": "The post text; only provide this when should_post is true",
+            },
+        },
+        "required": ["should_post", "reasoning"],
+    },
+}
+
+SYSTEM_PROMPT = """You are evaluating whether recent commits warrant a "build in public" social media post, and writing the post if they do.
 
-def clean_json_response(response_text: str) -> str:
-    """
-    Clean AI response text by removing markdown code blocks if present.
-    
-    Args:
-        response_text: Raw response text from AI
-        
-    Returns:
-        Cleaned text ready for JSON parsing
-    """
-    cleaned_response = response_text.strip()
-    
-    if cleaned_response.startswith("```json"):
-        # Remove ```json from start and ``` from end
-        cleaned_response = cleaned_response[7:]  # Remove "```json"
-        if cleaned_response.endswith("```"):
-            cleaned_response = cleaned_response[:-3]  # Remove trailing "```"
-        cleaned_response = cleaned_response.strip()
-    elif cleaned_response.startswith("```"):
-        # Handle generic code blocks
-        cleaned_response = cleaned_response[3:]  # Remove "```"
-        if cleaned_response.endswith("```"):
-            cleaned_response = cleaned_response[:-3]  # Remove trailing "```"
-        cleaned_response = cleaned_response.strip()
-    
-    return cleaned_response
+Consider these factors:
+- Is there meaningful progress or a new feature?
+- Are there multiple commits that together show significant work?
+- Would this be interesting to followers who want to see development progress?
+- Is this more than just minor fixes or routine maintenance?
 
-def summarize_commits(commit_messages: list[str]) -> str:
-    """
-    Use Claude 4.5 Haiku to summarize commit messages into a "build in public" style post.
-    
-    Args:
-        commit_messages: List of commit messages from the push event
-        
-    Returns:
-        A concise, casual, and engaging summary suitable for social posting
-    """
-    logger.info(f"Starting commit summarization for {len(commit_messages)} commits")
-    
-    # Log commit messages for debugging
-    logger.info("Input commit messages:")
-    for i, msg in enumerate(commit_messages):
-        logger.info(f"  {i+1}. {msg}")
-    
-    # Check for API key
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        logger.error("ANTHROPIC_API_KEY environment variable not set")
-        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-    
-    logger.info("Initializing Anthropic client")
-    client = Anthropic(api_key=api_key)
-    
-    # Combine all commit messages
-    commits_text = "\n".join(f"- {msg}" for msg in commit_messages)
-    logger.info(f"Combined commit text length: {len(commits_text)} characters")
-    
-    prompt = f"""You are helping create a "build in public" social media post from these git commit messages:
+Examples of what warrants posting:
+- New features or major functionality
+- Significant refactoring or improvements
+- Multiple commits showing iterative development
+- Bug fixes that solve important problems
 
-{commits_text}
+Examples of what doesn't warrant posting:
+- Single minor typo fixes
+- Routine dependency updates
+- Small formatting changes
+- Single commit with minimal impact
 
-Transform these technical commit messages into a single, casual, engaging post that:
+Be selective - only post about meaningful progress.
+
+If the commits warrant a post, transform these technical commit messages into a single, casual, engaging post that:
 - Is under 280 characters
 - Feels natural and enthusiastic (like you're sharing progress with friends)
 - Highlights what was built or improved
 - Doesn't use hashtags or emojis
 - Avoids overly technical jargon
 
-Just respond with the post text, nothing else."""
-    
-    logger.info(f"Prompt length: {len(prompt)} characters")
-    logger.info("Sending request to Claude API")
+Record your decision, and the post text if posting, with the decide tool."""
+
+# Shared Anthropic client, created on first use so its connection pool is reused across requests
+_client: AsyncAnthropic | None = None
+
+# Content hash of the commit messages -> Claude's verdict, so replayed or retried pushes skip the round trip
+_evaluation_cache: TTLCache[bytes, tuple[bool, str, str | None]] = TTLCache(maxsize=50_000, ttl=86400)
+
+
+def _commit_messages_key(commit_messages: list[str]) -> bytes:
+    """Hash the normalized, order-independent set of commit messages."""
+    normalized = sorted(msg.strip() for msg in commit_messages)
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).digest()
+
+
+def _get_client() -> AsyncAnthropic:
+    """
+    Return the shared Anthropic client, creating it on first use.
     
-    try:
-        message = client.messages.create(
-            model="claude-haiku-4-5-20251001",
-            max_tokens=200,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        logger.info("Claude API request completed successfully")
-        logger.info(f"Response content length: {len(message.content[0].text)} characters")
-        
-        # Extract the text from the response
-        result = message.content[0].text.strip()
-        logger.info(f"Generated post content: {result}")
-        
-        return result
+    Raises:
+        ValueError: If ANTHROPIC_API_KEY is not set
+    """
+    global _client
+    if _client is None:
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            logger.error("ANTHROPIC_API_KEY environment variable not set")
+            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
         
-    except Exception as e:
-        logger.error(f"Error calling Claude API: {str(e)}")
-        raise
+        logger.debug("Initializing Anthropic client")
+        _client = AsyncAnthropic(api_key=api_key, http_client=DefaultAsyncHttpxClient(http2=True))
+    return _client
 
 
-def should_post_about_commits(commit_messages: list[str]) -> tuple[bool, str]:
+async def evaluate_commits(commit_messages: list[str]) -> tuple[bool, str, str | None]:
     """
-    Use Claude to determine if recent commits warrant a "build in public" post.
+    Use Claude 4.5 Haiku to decide if recent commits warrant a "build in public" post
+    and, if they do, draft it in the same request.
+    
+    Successful verdicts are cached in-process by message content for a day.
     
     Args:
         commit_messages: List of recent commit messages
-        
+    
     Returns:
-        Tuple of (should_post, reasoning)
+        Tuple of (should_post, reasoning, post_text); post_text is None when not posting
     """
-    logger.info(f"Evaluating {len(commit_messages)} commits for post worthiness")
-    
-    # Log commit messages for debugging
-    logger.info("Recent commit messages:")
-    for i, msg in enumerate(commit_messages):
-        logger.info(f"  {i+1}. {msg}")
+    logger.debug("Evaluating %s commits for post worthiness", len(commit_messages))
     
-    # Check for API key
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        logger.error("ANTHROPIC_API_KEY environment variable not set")
-        raise ValueError("ANTHROPIC_API_KEY environment variable not set")
+    cache_key = _commit_messages_key(commit_messages)
+    cached = _evaluation_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Evaluation cache hit for %s commits", len(commit_messages))
+        return cached
     
-    logger.info("Initializing Anthropic client for post evaluation")
-    client = Anthropic(api_key=api_key)
+    client = _get_client()
     
-    # Combine all commit messages
+    # Only the commit list varies per request; the instructions live in the cached system prompt
     commits_text = "\n".join(f"- {msg}" for msg in commit_messages)
-    logger.info(f"Combined commit text length: {len(commits_text)} characters")
+    logger.debug("Combined commit text length: %s characters", len(commits_text))
     
-    prompt = f"""You are evaluating whether recent commits warrant a "build in public" social media post.
-
-Recent commits:
-{commits_text}
-
-Consider these factors:
-- Is there meaningful progress or a new feature?
-- Are there multiple commits that together show significant work?
-- Would this be interesting to followers who want to see development progress?
-- Is this more than just minor fixes or routine maintenance?
-
-Respond with a JSON object containing:
-- "should_post": true/false
-- "reasoning": brief explanation of your decision
-Surround the JSON object with ```json and ```.
-
-Examples of what warrants posting:
-- New features or major functionality
-- Significant refactoring or improvements
-- Multiple commits showing iterative development
-- Bug fixes that solve important problems
+    prompt = f"""Recent commits:
+{commits_text}"""
 
-Examples of what doesn't warrant posting:
-- Single minor typo fixes
-- Routine dependency updates
-- Small formatting changes
-- Single commit with minimal impact
-
-Be selective - only post about meaningful progress."""
-    
-    logger.info(f"Prompt length: {len(prompt)} characters")
-    logger.info("Sending evaluation request to Claude API")
+    logger.debug("Prompt length: %s characters", len(prompt))
+    logger.debug("Sending evaluation request to Claude API")
     
     try:
-        message = client.messages.create(
+        message = await client.messages.create(
             model="claude-haiku-4-5-20251001",
-            max_tokens=300,
+            max_tokens=500,
+            tools=[DECIDE_TOOL],
+            tool_choice={"type": "tool", "name": DECIDE_TOOL["name"]},
+            system=[
+                {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+            ],
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
         
-        logger.info("Claude API evaluation request completed successfully")
+        logger.debug("Claude API evaluation request completed successfully")
         
-        # Extract the JSON response
-        response_text = message.content[0].text.strip()
-        logger.info(f"Claude response: {response_text}")
+        # The forced tool call carries the decision as already-parsed input
+        result = message.content[0].input
+        should_post = result.get("should_post", False)
+        reasoning = result.get("reasoning", "No reasoning provided")
+        post_text = (result.get("post_text") or "").strip() or None
         
-        # Clean the response text by removing markdown code blocks if present
-        cleaned_response = clean_json_response(response_text)
-        logger.info(f"Cleaned response: {cleaned_response}")
+        if should_post and not post_text:
+            logger.warning("Claude decided to post but did not provide post text")
+            return False, "AI decided to post but provided no post text", None
         
-        # Parse JSON response
-        try:
-            result = json.loads(cleaned_response)
-            should_post = result.get("should_post", False)
-            reasoning = result.get("reasoning", "No reasoning provided")
-            
-            logger.info(f"Evaluation result: {'POST' if should_post else 'SKIP'}")
-            logger.info(f"Reasoning: {reasoning}")
-            
-            return should_post, reasoning
-            
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Claude JSON response: {str(e)}")
-            logger.error(f"Raw response: {response_text}")
-            logger.error(f"Cleaned response: {cleaned_response}")
-            # Fallback: if we can't parse, be conservative and don't post
-            return False, f"Failed to parse AI response: {str(e)}"
+        logger.debug("Evaluation result: %s", 'POST' if should_post else 'SKIP')
+        logger.debug("Reasoning: %s", reasoning)
+        logger.debug("Generated post content: %s", post_text)
         
+        result = (should_post, reasoning, post_text if should_post else None)
+        _evaluation_cache[cache_key] = result
+        return result
+    
     except Exception as e:
-        logger.error(f"Error calling Claude API for evaluation: {str(e)}")
+        logger.error("Error calling Claude API for evaluation: %s", e)
         # Fallback: if AI fails, be conservative and don't post
-        return False, f"AI evaluation failed: {str(e)}"
-
+        return False, f"AI evaluation failed: {str(e)}", None
@@ -1,14 +1,21 @@
+import os
 import uvicorn
 import logging
-from app import app
+from dotenv import load_dotenv
+
+# Read WEB_CONCURRENCY and LOG_LEVEL from .env before anything uses them
+load_dotenv()
 
 # Configure logging
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# One worker per core unless overridden
+WORKERS = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
 
 def main():
     """Run the FastAPI application"""
@@ -17,11 +24,14 @@ def main():
     logger.info("  Host: 0.0.0.0")
     logger.info("  Port: 8000")
     logger.info("  App: FastAPI")
+    logger.info("  Event loop: uvloop, HTTP parser: httptools")
+    logger.info("  Workers: %s", WORKERS)
     
     try:
-        uvicorn.run(app, host="0.0.0.0", port=8000)
+        # Workers need an import string so each process builds its own app, clients and caches
+        uvicorn.run("app:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools", workers=WORKERS)
     except Exception as e:
-        logger.error(f"Failed to start server: {str(e)}")
+        logger.error("Failed to start server: %s", e)
         raise
 
 
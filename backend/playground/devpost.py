@@ -1,15 +1,12 @@
 from typing import List
-from selenium.webdriver.remote.webelement import WebElement
-
-
-from selenium.webdriver.remote.webelement import WebElement
-
-
-from selenium import webdriver
-from selenium.webdriver.common.by import By
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+import asyncio
+import httpx
+import lxml.html
+from lxml.cssselect import CSSSelector
+from lxml.etree import XPath
 import os
 
 load_dotenv()
@@ -23,94 +20,119 @@ class ProjectPreview(BaseModel):
     devpost_url: str
     thumbnail_url: str
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
+PROJECT_PREVIEWS_ADAPTER = TypeAdapter(List[ProjectPreview])
+
+# Selectors are compiled once instead of on every lookup
+PROJECT_CONTAINER_SELECTOR = CSSSelector("a.link-to-software")
+PROJECT_THUMBNAIL_SELECTOR = CSSSelector("img.software_thumbnail_image")
+PROJECT_NAME_SELECTOR = CSSSelector(".entry-body h5")
+PROJECT_TAGLINE_SELECTOR = CSSSelector(".entry-body p.tagline")
+PROJECT_DESCRIPTION_XPATH = XPath('//div[@id="app-details-left"]/div[not(@id)]')
+PROJECT_GITHUB_URL_XPATH = XPath('//ul[@data-role="software-urls"]//a[i[contains(@class, "ss-octocat")]]/@href')
+PROJECT_STARTED_AT_XPATH = XPath('//time[contains(concat(" ", normalize-space(@class), " "), " timeago ")]/@datetime')
 
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")
-driver = webdriver.Chrome(options=options)
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_SECRET_KEY)
 
 user_id = input("Enter user ID: ")
 
 devpost_url = supabase.table("profiles").select("devpost_url").eq("id", user_id).execute().data[0]["devpost_url"]
-driver.get(devpost_url)
-
-project_containers = driver.find_elements(By.CSS_SELECTOR, "a.link-to-software")
-projects_count = len(project_containers)
-
-print(f"Projects count: {projects_count}")
-
-project_previews: List[ProjectPreview] = []
-for i, project_container in enumerate[WebElement](project_containers):
-    # Get project summary data BEFORE navigating away
-    project_url = project_container.get_attribute("href")
-    project_thumbnail_url = project_container.find_element(By.CSS_SELECTOR, "img.software_thumbnail_image").get_attribute("src")
-    project_body_container = project_container.find_element(By.CSS_SELECTOR, ".entry-body")
-    project_name = project_body_container.find_element(By.TAG_NAME, "h5").text.strip()
-    project_tagline = project_body_container.find_element(By.CSS_SELECTOR, "p.tagline").text.strip()
-
-    project_previews.append(
-        ProjectPreview(
-            title=project_name,
-            tagline=project_tagline,
-            devpost_url=project_url,
-            thumbnail_url=project_thumbnail_url,
-        )
-    )
-
-for i, project in enumerate(project_previews):
-    # Navigate to project page to get additional details
-    driver.get(project.devpost_url)
-    
-    try:
-        project_details_container = driver.find_element(By.ID, "app-details-left")
-        project_description = project_details_container.find_element(By.XPATH, "./div[not(@id)]").text.strip()
-    except Exception as e:
-        print(f"Error getting project description for {project.title}: {e}")
+
+
+def parse_project_previews(html: str, base_url: str) -> List[ProjectPreview]:
+    # Devpost renders the portfolio server-side, so the raw HTML already has every project card
+    listing_page = lxml.html.fromstring(html, base_url=base_url)
+    listing_page.make_links_absolute()
+
+    preview_rows: List[dict] = []
+    for project_container in PROJECT_CONTAINER_SELECTOR(listing_page):
+        project_url = project_container.get("href")
+        project_thumbnail_url = PROJECT_THUMBNAIL_SELECTOR(project_container)[0].get("src")
+        project_name = PROJECT_NAME_SELECTOR(project_container)[0].text_content().strip()
+        project_tagline = PROJECT_TAGLINE_SELECTOR(project_container)[0].text_content().strip()
+
+        preview_rows.append({
+            "title": project_name,
+            "tagline": project_tagline,
+            "devpost_url": project_url,
+            "thumbnail_url": project_thumbnail_url,
+        })
+
+    # Validate every row in one pass through the compiled list schema
+    return PROJECT_PREVIEWS_ADAPTER.validate_python(preview_rows)
+
+
+def parse_project_details(project: ProjectPreview, html: str) -> dict:
+    page = lxml.html.fromstring(html)
+
+    description_elems = PROJECT_DESCRIPTION_XPATH(page)
+    if description_elems:
+        project_description = description_elems[0].text_content().strip()
+    else:
+        print(f"Error getting project description for {project.title}: description not found")
         project_description = ""
 
-    try:
-        software_urls_container = driver.find_element(By.CSS_SELECTOR, 'ul[data-role="software-urls"]')
-        
-        # Get GitHub URL
-        github_a_elem = None
-        for a in software_urls_container.find_elements(By.TAG_NAME, "a"):
-            try:
-                i_elem = a.find_element(By.XPATH, "./i[contains(@class, 'ss-octocat')]")
-                if i_elem:
-                    github_a_elem = a
-                    break
-            except Exception:
-                continue
-        github_url = github_a_elem.get_attribute("href") if github_a_elem else None
-    except Exception as e:
-        print(f"Error getting GitHub URL for {project_name}: {e}")
-        github_url = None
+    # Get GitHub URL
+    github_urls = PROJECT_GITHUB_URL_XPATH(page)
+    github_url = github_urls[0] if github_urls else None
 
-    try:
-        time_elem = driver.find_element(By.CSS_SELECTOR, "time.timeago")
-        started_at = time_elem.get_attribute("datetime") if time_elem else None
-    except Exception as e:
-        print(f"Error getting start date for {project.title}: {e}")
-        started_at = None
+    started_ats = PROJECT_STARTED_AT_XPATH(page)
+    started_at = started_ats[0] if started_ats else None
+
+    return build_project_row(project, project_description, github_url, started_at)
 
-    supabase.table("projects").insert({
+
+def build_project_row(project: ProjectPreview, description: str, github_url: str | None, started_at: str | None) -> dict:
+    return {
         "user_id": user_id,
         "title": project.title,
         "tagline": project.tagline,
-        "description": project_description,
+        "description": description,
         "github_url": github_url,
         "devpost_url": project.devpost_url,
         "thumbnail_url": project.thumbnail_url,
         "started_at": started_at,
         "type": "hackathon",
         "is_public": True,
-    }).execute()
-    
-    print(f"Project: {project_name}")
-    print(f"Description: {project_description}")
-    print(f"GitHub URL: {github_url}")
-    print(f"Started at: {started_at}")
-    print(f"Fetched project {i + 1} of {projects_count}")
+    }
+
+
+async def fetch_project_details(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, project: ProjectPreview) -> dict:
+    # Navigate to project page to get additional details
+    try:
+        async with semaphore:
+            response = await client.get(project.devpost_url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        # One broken project page shouldn't lose the rest of the portfolio; keep the summary row
+        print(f"Error getting project details for {project.title}: {e}")
+        return build_project_row(project, "", None, None)
+    return parse_project_details(project, response.text)
+
+
+async def fetch_projects() -> List[dict]:
+    async with httpx.AsyncClient(follow_redirects=True, timeout=20) as client:
+        response = await client.get(devpost_url)
+        response.raise_for_status()
+        project_previews = parse_project_previews(response.text, str(response.url))
+
+        print(f"Projects count: {len(project_previews)}")
+
+        # Bound concurrency so Devpost isn't hit with every project page at once
+        semaphore = asyncio.Semaphore(10)
+        return await asyncio.gather(*[fetch_project_details(client, semaphore, project) for project in project_previews])
+
+
+project_rows = asyncio.run(fetch_projects())
+
+for i, row in enumerate(project_rows):
+    print(f"Project: {row['title']}")
+    print(f"Description: {row['description']}")
+    print(f"GitHub URL: {row['github_url']}")
+    print(f"Started at: {row['started_at']}")
+    print(f"Fetched project {i + 1} of {len(project_rows)}")
     print("-" * 50)
 
-driver.quit()
+# Insert every project in a single request instead of one per project
+if project_rows:
+    supabase.table("projects").insert(project_rows).execute()
+    print(f"Inserted {len(project_rows)} projects")
@@ -1,46 +1,78 @@
-import requests
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from base64 import b64decode
 import os
 
 load_dotenv()
 
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+if not GITHUB_TOKEN:
+    raise Exception("GITHUB_TOKEN environment variable not set - the GitHub GraphQL API requires a token")
+
 supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SECRET_KEY"))
 
 github_username = input("Enter GitHub username: ")
 user_id = supabase.table("profiles").select("id").eq("github_url", f"https://github.com/{github_username}").single().execute().data["id"]
 
-url = f"https://api.github.com/users/{github_username}/repos"
-response = requests.get(url, headers={
-    "Accept": "application/vnd.github+json",
-    "X-GitHub-Api-Version": "2022-11-28",
-})
+# Repos and their READMEs in a single GraphQL request instead of one REST call per repo
+REPOS_QUERY = """
+query($login: String!) {
+  user(login: $login) {
+    repositories(first: 100, ownerAffiliations: OWNER, privacy: PUBLIC, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes {
+        name
+        description
+        url
+        createdAt
+        owner {
+          avatarUrl
+        }
+        readme: object(expression: "HEAD:README.md") {
+          ... on Blob {
+            text
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# GraphQL requires authentication, unlike the public REST endpoints
+response = httpx.post("https://api.github.com/graphql", headers={
+    "Authorization": f"Bearer {GITHUB_TOKEN}",
+}, json={
+    "query": REPOS_QUERY,
+    "variables": {"login": github_username},
+}, timeout=30)
 if response.status_code != 200:
     raise Exception(f"Failed to get GitHub repos: status code {response.status_code}")
 
-repos = response.json()
+result = response.json()
+if result.get("errors"):
+    raise Exception(f"Failed to get GitHub repos: {result['errors']}")
+
+repos = result["data"]["user"]["repositories"]["nodes"]
 print(repos)
 
+project_rows = []
 for repo in repos:
-    description = repo["description"]
-    response = requests.get(repo["contents_url"].replace("{+path}", "README.md"), headers={
-        "Accept": "application/vnd.github.object",
-        "X-GitHub-Api-Version": "2022-11-28",
+    # GraphQL returns the README as text, so there's nothing to base64 decode
+    readme = repo["readme"]
+    description = readme["text"] if readme and readme.get("text") else repo["description"]
+
+    project_rows.append({
+        "user_id": user_id,
+        "title": repo["name"],
+        "tagline": repo["description"],
+        "description": description,
+        "github_url": repo["url"],
+        "devpost_url": None,
+        "thumbnail_url": repo["owner"]["avatarUrl"],
+        "started_at": repo["createdAt"],
+        "type": "codebase",
+        "is_public": True,
     })
-    if response.status_code == 200:
-        content = str(b64decode(response.json()["content"]))
-        description = content
-
-    # supabase.table("projects").insert({
-    #     "user_id": user_id,
-    #     "title": repo["name"],
-    #     "tagline": repo["description"],
-    #     "description": description,
-    #     "github_url": repo["html_url"],
-    #     "devpost_url": None,
-    #     "thumbnail_url": repo["owner"]["avatar_url"],
-    #     "started_at": repo["created_at"],
-    #     "type": "codebase",
-    #     "is_public": True,
-    # }).execute()
\ No newline at end of file
+
+# Insert every repo in a single request instead of one per repo
+# supabase.table("projects").insert(project_rows).execute()
@@ -1,7 +1,8 @@
 from dotenv import load_dotenv
+import asyncio
 import os
-import requests
-from supabase import create_client, Client
+import httpx
+from supabase import acreate_client, AsyncClient
 
 load_dotenv()
 
@@ -9,16 +10,12 @@ RAI_API_KEY = os.getenv("RAI_API_KEY")
 RAI_REGION = os.getenv("RAI_REGION")
 RAI_PROJECT = os.getenv("RAI_PROJECT")
 RAI_LINKEDIN_TOOL_ID = os.getenv("RAI_LINKEDIN_TOOL_ID")
-supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SECRET_KEY"))
 
 # linkedin_url = input("Enter LinkedIn URL: ")
 
-def sync_linkedin(user_id: str, linkedin_url: str) -> None:
+async def sync_linkedin(client: httpx.AsyncClient, supabase: AsyncClient, user_id: str, linkedin_url: str) -> None:
     print(f"Processing {linkedin_url} for user {user_id}")
     url = f"https://api-{RAI_REGION}.stack.tryrelevance.com/latest/studios/{RAI_LINKEDIN_TOOL_ID}/trigger_limited"
-    headers = {
-        "Authorization": f"{RAI_PROJECT}:{RAI_API_KEY}"
-    }
     body = {
         "params": {
             "url": linkedin_url,
@@ -26,7 +23,7 @@ def sync_linkedin(user_id: str, linkedin_url: str) -> None:
         "project": RAI_PROJECT,
     }
 
-    response = requests.post(url, headers=headers, json=body)
+    response = await client.post(url, json=body)
     if response.status_code != 200:
         raise Exception(f"Failed to scrape LinkedIn profile: status code {response.status_code}")
 
@@ -35,12 +32,28 @@ def sync_linkedin(user_id: str, linkedin_url: str) -> None:
         raise Exception(f"Failed to scrape LinkedIn profile: {result.get("errors")}")
 
     profile = result["output"]["linkedin_profile"]
-    supabase.table("profiles").update({
+    await supabase.table("profiles").update({
         "linkedin_data_raw": profile,
         "about": profile["about"],
         "headline": profile["headline"],
     }).eq("id", user_id).execute()
 
-profiles = supabase.table("profiles").select("id, linkedin_url").is_("linkedin_data_raw", None).neq("linkedin_url", "").execute().data
-for profile in profiles:
-    sync_linkedin(profile["id"], profile["linkedin_url"])
\ No newline at end of file
+
+async def main() -> None:
+    supabase: AsyncClient = await acreate_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SECRET_KEY"))
+
+    profiles = (await supabase.table("profiles").select("id, linkedin_url").is_("linkedin_data_raw", None).neq("linkedin_url", "").execute()).data
+
+    # One keep-alive client for every Relevance AI call; the scrapes are slow, so run
+    # several at once but bound them so the tool isn't flooded
+    semaphore = asyncio.Semaphore(8)
+
+    async def sync_profile(profile: dict) -> None:
+        async with semaphore:
+            await sync_linkedin(client, supabase, profile["id"], profile["linkedin_url"])
+
+    async with httpx.AsyncClient(headers={"Authorization": f"{RAI_PROJECT}:{RAI_API_KEY}"}, timeout=120) as client:
+        await asyncio.gather(*[sync_profile(profile) for profile in profiles])
+
+
+asyncio.run(main())
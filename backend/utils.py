@@ -1,12 +1,16 @@
 import os
 import hmac
-import hashlib
 import logging
 from datetime import datetime
+from functools import lru_cache
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# X-Hub-Signature-256 is "sha256=" followed by a 64 character hex digest
+SIGNATURE_PREFIX = "sha256="
+SIGNATURE_HEADER_LENGTH = len(SIGNATURE_PREFIX) + 64
+
 
 def convert_timestamp_to_iso(timestamp: str | int | None) -> str | None:
     """
@@ -22,73 +26,103 @@ def convert_timestamp_to_iso(timestamp: str | int | None) -> str | None:
     if timestamp is None:
         return None
     
+    # GitHub commit timestamps are already ISO strings ("YYYY-MM-DD..."); pass them through
+    # with a cheap shape check and let Postgres reject anything malformed on insert
+    if isinstance(timestamp, str) and len(timestamp) >= 10 and timestamp[4] == '-':
+        return timestamp
+    
     try:
-        # If it's already an ISO format string (contains 'T' or '-'), return as-is
-        if isinstance(timestamp, str) and ('T' in timestamp or '-' in timestamp):
-            # Validate it's a proper ISO format by trying to parse it
-            datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            logger.debug(f"Timestamp {timestamp} is already in ISO format")
-            return timestamp
-        
-        # Convert to int if it's a string (Unix timestamp)
-        if isinstance(timestamp, str):
-            timestamp_int = int(timestamp)
-        else:
-            timestamp_int = timestamp
+        # Unix timestamp, either as an int (pushed_at) or a numeric string
+        timestamp_int = timestamp if isinstance(timestamp, int) else int(timestamp)
         
         # Validate timestamp range (reasonable bounds for Unix timestamps)
         # Min: Jan 1, 1970 (0), Max: Jan 1, 2100 (4102444800)
         if timestamp_int < 0 or timestamp_int > 4102444800:
-            logger.warning(f"Timestamp {timestamp_int} is outside reasonable range")
+            logger.warning("Timestamp %s is outside reasonable range", timestamp_int)
             return None
         
         # Convert Unix timestamp to datetime and then to ISO format
         dt = datetime.fromtimestamp(timestamp_int)
         iso_string = dt.isoformat()
         
-        logger.debug(f"Converted Unix timestamp {timestamp_int} to {iso_string}")
+        logger.debug("Converted Unix timestamp %s to %s", timestamp_int, iso_string)
         return iso_string
         
     except (ValueError, TypeError, OSError) as e:
-        logger.error(f"Failed to convert timestamp {timestamp}: {str(e)}")
+        logger.error("Failed to convert timestamp %s: %s", timestamp, e)
         return None
 
 
-def verify_github_signature(payload_body: bytes, signature_header: str, webhook_secret: str) -> bool:
+def is_well_formed_signature(signature_header: str | None) -> bool:
     """
-    Verify that the payload was sent from GitHub by validating SHA256 signature.
+    Check that an X-Hub-Signature-256 header has the expected shape.
+    
+    Cheap enough to run before reading the body, so malformed requests never
+    cost an HMAC computation.
     
     Args:
-        payload_body: Raw request body bytes
         signature_header: The X-Hub-Signature-256 header value
-        webhook_secret: The GitHub webhook secret
         
     Returns:
-        True if signature is valid, False otherwise
+        True if the header is "sha256=" followed by a 64 character digest
+    """
+    return (
+        signature_header is not None
+        and len(signature_header) == SIGNATURE_HEADER_LENGTH
+        and signature_header.startswith(SIGNATURE_PREFIX)
+    )
+
+
+def create_signature_hmac(webhook_secret: bytes) -> hmac.HMAC:
     """
-    logger.info(f"Verifying GitHub signature - payload size: {len(payload_body)} bytes")
+    Create an incremental HMAC-SHA256 to feed the webhook body into as it streams in.
     
+    The HMAC is computed by OpenSSL's SHA-256 (SHA-NI accelerated on CPUs
+    that support it) rather than a Python-level hash object.
+    
+    Args:
+        webhook_secret: The GitHub webhook secret, UTF-8 encoded once at startup
+        
+    Returns:
+        A fresh HMAC object keyed with the webhook secret
+    """
     if not webhook_secret:
         logger.error("GitHub webhook secret is not configured")
         raise ValueError("GitHub webhook secret is not configured")
     
-    if not signature_header:
-        logger.warning("No signature header provided")
-        return False
+    # Copying the keyed template skips re-hashing the padded key on every request
+    return _signature_hmac_template(webhook_secret).copy()
+
+
+@lru_cache(maxsize=1)
+def _signature_hmac_template(webhook_secret: bytes) -> hmac.HMAC:
+    """Key an HMAC-SHA256 once per secret; callers must copy it before updating."""
+    return hmac.new(webhook_secret, digestmod="sha256")
+
+
+def verify_github_signature(payload_hmac: hmac.HMAC, signature_header: str) -> bool:
+    """
+    Verify that the payload was sent from GitHub by validating SHA256 signature.
     
-    # Compute the expected signature
-    hash_object = hmac.new(
-        webhook_secret.encode('utf-8'),
-        msg=payload_body,
-        digestmod=hashlib.sha256
-    )
-    expected_signature = f"sha256={hash_object.hexdigest()}"
+    Args:
+        payload_hmac: HMAC from create_signature_hmac, updated with the full request body
+        signature_header: The X-Hub-Signature-256 header value
+        
+    Returns:
+        True if signature is valid, False otherwise
+    """
+    if not is_well_formed_signature(signature_header):
+        logger.warning("Malformed signature header provided")
+        return False
     
-    logger.info(f"Expected signature: {expected_signature[:20]}...")
-    logger.info(f"Received signature: {signature_header[:20]}...")
+    expected_signature = SIGNATURE_PREFIX + payload_hmac.hexdigest()
     
     # Compare signatures using constant-time comparison
     is_valid = hmac.compare_digest(expected_signature, signature_header)
-    logger.info(f"Signature verification result: {'VALID' if is_valid else 'INVALID'}")
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Expected signature: %s...", expected_signature[:20])
+        logger.debug("Received signature: %s...", signature_header[:20])
+        logger.debug("Signature verification result: %s", 'VALID' if is_valid else 'INVALID')
     
     return is_valid
@@ -1,19 +1,37 @@
+import asyncio
+import hashlib
+import hmac
 import logging
 import json
 import os
+import shutil
+import subprocess
+import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from weakref import WeakValueDictionary
+import httpx
+import lxml.html
+from cachetools import TTLCache
+from lxml.cssselect import CSSSelector
 from tempfile import mkdtemp
 from typing import List
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options as ChromeOptions
-from pydantic import BaseModel
-from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+from pydantic import BaseModel, ConfigDict, TypeAdapter
 from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel as PydanticBaseModel
 from supabase import create_client, Client
+from postgrest.types import ReturnMethod
 
 
 class DevpostProject(BaseModel):
+    # Scrapes are cached and shared between requests, so keep them immutable
+    model_config = ConfigDict(frozen=True)
+
     name: str
     tagline: str
     url: str
@@ -21,6 +39,15 @@ class DevpostProject(BaseModel):
     # description: str
 
 
+DEVPOST_PROJECTS_ADAPTER = TypeAdapter(List[DevpostProject])
+
+# Devpost portfolio selectors, compiled to XPath once instead of on every lookup
+PROJECT_CONTAINER_SELECTOR = CSSSelector("a.link-to-software")
+PROJECT_THUMBNAIL_SELECTOR = CSSSelector("img.software_thumbnail_image")
+PROJECT_NAME_SELECTOR = CSSSelector(".entry-body h5")
+PROJECT_TAGLINE_SELECTOR = CSSSelector(".entry-body p.tagline")
+
+
 class ProcessDevpostRequest(PydanticBaseModel):
     devpost_url: str
     user_id: str
@@ -30,12 +57,14 @@ class ProcessDevpostResponse(PydanticBaseModel):
     status: str
     projects: List[DevpostProject]
     inserted_count: int
+    cached: bool = False
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize Supabase client
+# Initialize Supabase client once; warm requests reuse it and its connection pool
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
     logger.info("Initializing Supabase client")
     supabase_url = os.environ.get("SUPABASE_URL")
@@ -48,10 +77,12 @@ def get_supabase_client() -> Client:
     logger.info("Supabase configuration found, creating client")
     return create_client(supabase_url, supabase_key)
 
+# Expected bearer token, read and encoded once at startup
+CRAX_SECRET_KEY_BYTES = os.environ.get("CRAX_SECRET_KEY", "").encode("utf-8")
+
+
 # Authorization dependency
 def verify_authorization(authorization: str = Header(None)):
-    logger.info("Verifying authorization token")
-    
     if not authorization:
         logger.warning("Authorization header missing")
         raise HTTPException(status_code=401, detail="Authorization header missing")
@@ -60,41 +91,47 @@ def verify_authorization(authorization: str = Header(None)):
         logger.warning("Invalid authorization format - missing Bearer prefix")
         raise HTTPException(status_code=401, detail="Invalid authorization format")
     
-    token = authorization.split(" ")[1]
-    expected_token = os.environ.get("CRAX_SECRET_KEY")
+    token = authorization.removeprefix("Bearer ").strip()
     
-    if not expected_token:
+    if not CRAX_SECRET_KEY_BYTES:
         logger.error("CRAX_SECRET_KEY environment variable not configured")
         raise HTTPException(status_code=500, detail="CRAX_SECRET_KEY not configured")
     
-    if token != expected_token:
+    # Constant-time comparison so the token can't be recovered through response timing
+    if not hmac.compare_digest(token.encode("utf-8"), CRAX_SECRET_KEY_BYTES):
         logger.warning("Invalid authorization token provided")
         raise HTTPException(status_code=401, detail="Invalid authorization token")
     
-    logger.info("Authorization token verified successfully")
     return token
 
 
-def initialise_driver():
+def initialise_driver(profile_dir: str):
     chrome_options = ChromeOptions()
     chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--disable-dev-tools")
-    chrome_options.add_argument("--no-zygote")
-    chrome_options.add_argument("--single-process")
-    chrome_options.add_argument(f"--user-data-dir={mkdtemp()}")
-    chrome_options.add_argument(f"--data-path={mkdtemp()}")
-    chrome_options.add_argument(f"--disk-cache-dir={mkdtemp()}")
+    # Keep Chrome's multi-process renderers, but bound them for the container's PID and memory limits
+    chrome_options.add_argument("--renderer-process-limit=2")
+    chrome_options.add_argument(f"--user-data-dir={profile_dir}/user-data")
+    chrome_options.add_argument(f"--data-path={profile_dir}/data")
+    chrome_options.add_argument(f"--disk-cache-dir={profile_dir}/cache")
     chrome_options.add_argument("--remote-debugging-pipe")
-    chrome_options.add_argument("--verbose")
-    chrome_options.add_argument("--log-path=/tmp")
+    # Skip background work a one-page scrape never needs
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-sync")
+    chrome_options.add_argument("--disable-default-apps")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--disable-features=Translate,BackForwardCache")
     chrome_options.binary_location = "/opt/chrome/chrome-linux64/chrome"
 
     service = Service(
         executable_path="/opt/chrome-driver/chromedriver-linux64/chromedriver",
-        service_log_path="/tmp/chromedriver.log",
+        # Discard chromedriver logs instead of writing them to /tmp on every command
+        log_output=subprocess.DEVNULL,
     )
 
     driver = webdriver.Chrome(service=service, options=chrome_options)
@@ -102,56 +139,119 @@ def initialise_driver():
     return driver
 
 
-def process_devpost_projects(devpost_url: str):
-    logger.info(f"Initializing Chrome driver for devpost URL: {devpost_url}")
-    driver = initialise_driver()
-    logger.info("Chrome driver initialized successfully")
+# Chrome is started once per container and reused by warm requests; the lock also
+# serialises page loads, since a single driver can only drive one page at a time
+_driver = None
+_driver_lock = threading.Lock()
+# One temp directory holds the driver's profile, data and cache, and is removed with it
+_driver_profile_dir = None
+
+
+def _discard_driver() -> None:
+    """Quit the shared driver and delete its temp directory; the caller must hold _driver_lock."""
+    global _driver, _driver_profile_dir
+    try:
+        _driver.quit()
+    except Exception:
+        pass
+    _driver = None
+    shutil.rmtree(_driver_profile_dir, ignore_errors=True)
+    _driver_profile_dir = None
+
+
+def render_page(url: str) -> tuple[str, str]:
+    """Load a page in the shared Chrome driver and return its (page_source, current_url)."""
+    global _driver, _driver_profile_dir
+    with _driver_lock:
+        if _driver is None:
+            logger.info("Initializing Chrome driver")
+            _driver_profile_dir = mkdtemp(prefix="chrome-")
+            try:
+                _driver = initialise_driver(_driver_profile_dir)
+            except Exception:
+                shutil.rmtree(_driver_profile_dir, ignore_errors=True)
+                _driver_profile_dir = None
+                raise
+            logger.info("Chrome driver initialized successfully")
+        
+        try:
+            _driver.get(url)
+            page = _driver.page_source, _driver.current_url
+            # Don't carry session state into the next request
+            _driver.delete_all_cookies()
+            return page
+        except WebDriverException:
+            # Chrome may have crashed; drop it so the next request starts a fresh one
+            logger.warning("Chrome driver failed - restarting on next request")
+            _discard_driver()
+            raise
+
+
+def close_driver() -> None:
+    """Quit the shared Chrome driver, if one was started."""
+    with _driver_lock:
+        if _driver is not None:
+            logger.info("Closing Chrome driver")
+            _discard_driver()
+
+
+# Shared HTTP client so warm requests reuse Devpost connections
+http_client = httpx.Client(
+    timeout=15,
+    follow_redirects=True,
+    headers={"User-Agent": "Mozilla/5.0 (compatible; CraxDevpostProcessor/1.0)"},
+)
+
+
+def fetch_page(url: str) -> tuple[str, str]:
+    """
+    Fetch a page's HTML and final URL.
     
-    logger.info(f"Navigating to devpost URL: {devpost_url}")
-    driver.get(devpost_url)
+    Devpost renders portfolios server-side, so a plain HTTP request is enough;
+    Chrome is only started if that request is blocked, throttled or hits a server
+    error. Any other client error means the URL is bad, so it fails fast.
+    """
+    try:
+        response = http_client.get(url)
+    except httpx.TransportError as e:
+        logger.warning(f"Direct fetch of {url} failed ({e}) - falling back to Chrome")
+        return render_page(url)
 
-    devpost_projects: List[DevpostProject] = []
-    project_containers = driver.find_elements(By.CSS_SELECTOR, "a.link-to-software")
-    projects_count = len(project_containers)
+    if response.status_code in (403, 429) or response.status_code >= 500:
+        logger.warning(f"Direct fetch of {url} returned {response.status_code} - falling back to Chrome")
+        return render_page(url)
+    if response.status_code >= 400:
+        raise HTTPException(status_code=response.status_code, detail=f"Failed to fetch devpost URL: status code {response.status_code}")
+    return response.text, str(response.url)
 
-    logger.info(f"Found {projects_count} project containers on the page")
 
-    for i, project_container in enumerate(project_containers):
-        # Get project summary
-        project_url = project_container.get_attribute("href")
-        project_thumbnail_url = project_container.find_element(
-            By.CSS_SELECTOR, "img.software_thumbnail_image"
-        ).get_attribute("src")
-        project_body_container = project_container.find_element(
-            By.CSS_SELECTOR, ".entry-body"
-        )
-        project_name = project_body_container.find_element(
-            By.TAG_NAME, "h5"
-        ).text.strip()
-        project_tagline = project_body_container.find_element(
-            By.CSS_SELECTOR, "p.tagline"
-        ).text.strip()
-
-        # Get full project
-        # driver.get(project_url)
-        # project_details_container = driver.find_element(By.ID, "app-details-left")
-        # project_description = project_details_container.find_element(By.XPATH, "./div[not(@id)]").text.strip()
-
-        devpost_projects.append(
-            DevpostProject(
-                name=project_name,
-                tagline=project_tagline,
-                url=project_url,
-                thumbnail_url=project_thumbnail_url,
-                # description=project_description,
-            )
-        )
+def process_devpost_projects(devpost_url: str):
+    page_source, current_url = fetch_page(devpost_url)
 
-        logger.info(f"Fetched project {i + 1} of {projects_count}: {project_name}")
+    # Parse the page once, locally
+    page = lxml.html.fromstring(page_source, base_url=current_url)
+    # Resolve relative href/src values against the final URL
+    page.make_links_absolute()
 
-    logger.info(f"Completed scraping {len(devpost_projects)} projects from devpost")
-    logger.info("Closing Chrome driver")
-    driver.quit()
+    project_rows: List[dict] = []
+    for project_container in PROJECT_CONTAINER_SELECTOR(page):
+        # Get project summary
+        project_url = project_container.get("href")
+        project_thumbnail_url = PROJECT_THUMBNAIL_SELECTOR(project_container)[0].get("src")
+        project_name = PROJECT_NAME_SELECTOR(project_container)[0].text_content().strip()
+        project_tagline = PROJECT_TAGLINE_SELECTOR(project_container)[0].text_content().strip()
+
+        project_rows.append({
+            "name": project_name,
+            "tagline": project_tagline,
+            "url": project_url,
+            "thumbnail_url": project_thumbnail_url,
+            # "description": project_description,
+        })
+
+    # Validate every row in one pass through the compiled list schema
+    devpost_projects = DEVPOST_PROJECTS_ADAPTER.validate_python(project_rows)
+    logger.info("Scraped %d projects from %s", len(devpost_projects), devpost_url)
     
     return devpost_projects
 
@@ -162,12 +262,9 @@ def insert_projects_to_database(projects: List[DevpostProject], user_id: str, su
         logger.info("No projects to insert into database")
         return 0
     
-    logger.info(f"Preparing {len(projects)} projects for database insertion")
-    
     # Prepare projects for insertion
-    projects_to_insert = []
-    for project in projects:
-        project_data = {
+    projects_to_insert = [
+        {
             "user_id": user_id,
             "title": project.name,
             "tagline": project.tagline,
@@ -176,13 +273,12 @@ def insert_projects_to_database(projects: List[DevpostProject], user_id: str, su
             "thumbnail_url": project.thumbnail_url,
             "type": "hackathon"
         }
-        projects_to_insert.append(project_data)
-        logger.info(f"Prepared project for insertion: {project.name}")
+        for project in projects
+    ]
     
     try:
-        logger.info(f"Executing database insert for {len(projects_to_insert)} projects")
-        # Insert projects into the database
-        result = supabase.table("projects").insert(projects_to_insert).execute()
+        # Insert projects into the database; nothing is read back, so skip returning the rows
+        supabase.table("projects").insert(projects_to_insert, returning=ReturnMethod.minimal).execute()
         logger.info(f"Successfully inserted {len(projects_to_insert)} projects into database")
         return len(projects_to_insert)
     except Exception as e:
@@ -190,38 +286,106 @@ def insert_projects_to_database(projects: List[DevpostProject], user_id: str, su
         raise HTTPException(status_code=500, detail=f"Failed to insert projects: {str(e)}")
 
 
+# Recent scrapes by normalised portfolio URL, so repeat requests skip the fetch and parse
+_scrape_cache: TTLCache[str, List[DevpostProject]] = TTLCache(maxsize=512, ttl=600)
+# One lock per URL being scraped, so concurrent requests for it wait for a single scrape
+_scrape_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
+
+
+async def get_devpost_projects(devpost_url: str) -> List[DevpostProject]:
+    """Return the projects for a Devpost portfolio, scraping it only on a cache miss."""
+    cache_key = devpost_url.strip().rstrip("/").lower()
+    
+    projects = _scrape_cache.get(cache_key)
+    if projects is not None:
+        logger.info(f"Using cached scrape for devpost URL: {devpost_url}")
+        return projects
+    
+    lock = _scrape_locks.get(cache_key)
+    if lock is None:
+        lock = _scrape_locks[cache_key] = asyncio.Lock()
+    
+    async with lock:
+        projects = _scrape_cache.get(cache_key)
+        if projects is None:
+            # Scraping blocks, so run it off the event loop
+            projects = await asyncio.to_thread(process_devpost_projects, devpost_url)
+            _scrape_cache[cache_key] = projects
+    
+    return projects
+
+
+def hash_projects(projects: List[DevpostProject]) -> str:
+    """Hash a scrape's projects independently of the order Devpost lists them in."""
+    rows = sorted((project.model_dump() for project in projects), key=lambda row: row["url"])
+    return hashlib.blake2b(json.dumps(rows, sort_keys=True).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def insert_changed_projects(projects: List[DevpostProject], user_id: str, devpost_url: str, supabase: Client) -> tuple[int, bool]:
+    """
+    Insert projects unless this user's portfolio scraped identically last time.
+    
+    Returns (inserted_count, cached), where cached means the insert was skipped.
+    """
+    content_hash = hash_projects(projects)
+    
+    stored = supabase.table("devpost_scrape_hashes").select("content_hash").eq("user_id", user_id).eq("devpost_url", devpost_url).execute().data
+    if stored and stored[0]["content_hash"] == content_hash:
+        logger.info(f"Devpost portfolio unchanged since last import - skipping insert for user {user_id}")
+        return 0, True
+    
+    inserted_count = insert_projects_to_database(projects, user_id, supabase)
+    
+    supabase.table("devpost_scrape_hashes").upsert({
+        "user_id": user_id,
+        "devpost_url": devpost_url,
+        "content_hash": content_hash,
+    }, on_conflict="user_id,devpost_url", returning=ReturnMethod.minimal).execute()
+    
+    return inserted_count, False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release Chrome and pooled connections when the container shuts down
+    close_driver()
+    http_client.close()
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Devpost Processor", version="1.0.0")
+app = FastAPI(title="Devpost Processor", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 @app.post('/process-devpost', response_model=ProcessDevpostResponse)
 async def handle_process_devpost(
     request: ProcessDevpostRequest,
-    authorization: str = Depends(verify_authorization)
+    authorization: str = Depends(verify_authorization),
+    supabase: Client = Depends(get_supabase_client)
 ):
     try:
         logger.info(f"Processing devpost request for user {request.user_id} with URL: {request.devpost_url}")
         
-        # Get Supabase client
-        supabase = get_supabase_client()
-        logger.info("Supabase client initialized successfully")
-        
         # Process devpost projects
         logger.info("Starting devpost projects scraping...")
-        projects = process_devpost_projects(request.devpost_url)
+        projects = await get_devpost_projects(request.devpost_url)
         logger.info(f"Successfully scraped {len(projects)} projects from devpost")
         
         # Insert projects into database
         logger.info(f"Inserting {len(projects)} projects into database for user {request.user_id}")
-        inserted_count = insert_projects_to_database(projects, request.user_id, supabase)
+        inserted_count, cached = await asyncio.to_thread(insert_changed_projects, projects, request.user_id, request.devpost_url, supabase)
         logger.info(f"Successfully inserted {inserted_count} projects into database")
         
-        return ProcessDevpostResponse(
+        # The projects were validated when scraped; don't validate them again for the response
+        return ProcessDevpostResponse.model_construct(
             status='success',
             projects=projects,
-            inserted_count=inserted_count
+            inserted_count=inserted_count,
+            cached=cached
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing devpost: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,9 @@
 import functions_framework
 import os
+import hmac
 import requests
 import json
+import orjson
 import logging
 from typing import Dict, Any
 from supabase import create_client, Client
@@ -18,10 +20,17 @@ RAI_LINKEDIN_TOOL_ID = os.getenv("RAI_LINKEDIN_TOOL_ID")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 CRAX_SECRET_KEY = os.getenv("CRAX_SECRET_KEY")
+CRAX_SECRET_KEY_BYTES = CRAX_SECRET_KEY.encode("utf-8") if CRAX_SECRET_KEY else b""
 
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
 
+# Shared Relevance AI session so warm instances reuse the TLS connection
+rai_session = requests.Session()
+rai_session.headers.update({
+    "Authorization": f"{RAI_PROJECT}:{RAI_API_KEY}"
+})
+
 
 def verify_authorization(request) -> bool:
     """
@@ -44,10 +53,10 @@ def verify_authorization(request) -> bool:
         return False
     
     # Extract the token
-    token = auth_header[7:]  # Remove 'Bearer ' prefix
+    token = auth_header.removeprefix('Bearer ')
     
-    # Verify the token matches our secret key
-    if token != CRAX_SECRET_KEY:
+    # Verify the token matches our secret key, in constant time
+    if not hmac.compare_digest(token.encode("utf-8"), CRAX_SECRET_KEY_BYTES):
         logger.warning(f"Invalid authorization token provided")
         return False
     
@@ -59,9 +68,6 @@ def scrape_linkedin_profile(linkedin_url: str) -> Dict[str, Any]:
     Scrape LinkedIn profile using Relevance AI API
     """
     url = f"https://api-{RAI_REGION}.stack.tryrelevance.com/latest/studios/{RAI_LINKEDIN_TOOL_ID}/trigger_limited"
-    headers = {
-        "Authorization": f"{RAI_PROJECT}:{RAI_API_KEY}"
-    }
     body = {
         "params": {
             "url": linkedin_url,
@@ -70,10 +76,11 @@ def scrape_linkedin_profile(linkedin_url: str) -> Dict[str, Any]:
     }
 
     try:
-        response = requests.post(url, headers=headers, json=body, timeout=30)
+        response = rai_session.post(url, json=body, timeout=30)
         response.raise_for_status()
         
-        result = response.json()
+        # Parse the raw bytes with orjson rather than response.json()
+        result = orjson.loads(response.content)
         
         if len(result.get("errors", [])) > 0:
             raise Exception(f"LinkedIn scraping failed: {result.get('errors')}")
@@ -83,6 +90,9 @@ def scrape_linkedin_profile(linkedin_url: str) -> Dict[str, Any]:
     except requests.exceptions.RequestException as e:
         logger.error(f"Request failed: {str(e)}")
         raise Exception(f"Failed to scrape LinkedIn profile: {str(e)}")
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Invalid JSON response: {str(e)}")
+        raise Exception(f"Failed to scrape LinkedIn profile: {str(e)}")
     except KeyError as e:
         logger.error(f"Unexpected response format: {str(e)}")
         raise Exception(f"Unexpected response format from LinkedIn scraper: {str(e)}")
@@ -118,6 +128,13 @@ def update_supabase_profile(profile_data: Dict[str, Any], user_id: str) -> bool:
         return False
 
 
+def json_response(data: Dict[str, Any], status: int, headers: Dict[str, str]):
+    """
+    Serialize a JSON response body with orjson instead of Flask's stdlib encoder
+    """
+    return (orjson.dumps(data), status, {**headers, 'Content-Type': 'application/json'})
+
+
 @functions_framework.http
 def process_linkedin_webhook(request):
     """
@@ -141,28 +158,28 @@ def process_linkedin_webhook(request):
     
     # Verify authorization
     if not verify_authorization(request):
-        return ({'error': 'Unauthorized'}, 401, headers)
+        return json_response({'error': 'Unauthorized'}, 401, headers)
     
     try:
         # Parse request data
         request_data = request.get_json(silent=True)
         
         if not request_data:
-            return ({'error': 'No JSON data provided'}, 400, headers)
+            return json_response({'error': 'No JSON data provided'}, 400, headers)
         
         # Extract LinkedIn URL and user_id from request
         linkedin_url = request_data.get('linkedin_url')
         user_id = request_data.get('user_id')
         
         if not linkedin_url:
-            return ({'error': 'linkedin_url is required'}, 400, headers)
+            return json_response({'error': 'linkedin_url is required'}, 400, headers)
         
         if not user_id:
-            return ({'error': 'user_id is required'}, 400, headers)
+            return json_response({'error': 'user_id is required'}, 400, headers)
         
         # Validate LinkedIn URL format
         if not linkedin_url.startswith(('https://www.linkedin.com/', 'https://linkedin.com/')):
-            return ({'error': 'Invalid LinkedIn URL format'}, 400, headers)
+            return json_response({'error': 'Invalid LinkedIn URL format'}, 400, headers)
         
         logger.info(f"Processing LinkedIn URL: {linkedin_url}")
         
@@ -180,7 +197,7 @@ def process_linkedin_webhook(request):
         }
         
         logger.info("Successfully processed LinkedIn profile")
-        return (response_data, 200, headers)
+        return json_response(response_data, 200, headers)
         
     except Exception as e:
         logger.error(f"Error processing LinkedIn webhook: {str(e)}")
@@ -188,4 +205,4 @@ def process_linkedin_webhook(request):
             'success': False,
             'error': str(e)
         }
-        return (error_response, 500, headers)
\ No newline at end of file
+        return json_response(error_response, 500, headers)
\ No newline at end of file
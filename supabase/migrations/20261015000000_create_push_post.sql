@@ -0,0 +1,20 @@
+-- Create a "push" post and link the commits it summarizes in a single round trip.
+create or replace function public.create_push_post(
+    p_author_id uuid,
+    p_description text,
+    p_commit_ids uuid[]
+)
+returns setof public.posts
+language sql
+as $$
+    with new_post as (
+        insert into public.posts (author_id, description, type)
+        values (p_author_id, p_description, 'push')
+        returning *
+    ), linked_commits as (
+        update public.commits
+        set post_id = (select id from new_post)
+        where id = any(p_commit_ids)
+    )
+    select * from new_post;
+$$;
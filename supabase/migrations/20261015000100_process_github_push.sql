@@ -0,0 +1,55 @@
+-- Store the commits from a GitHub push and return the repository's unposted
+-- commits (most recent first) in a single round trip.
+create or replace function public.process_github_push(
+    p_user_id uuid,
+    p_repository_id text,
+    p_repository_name text,
+    p_owner_name text,
+    p_pushed_at timestamptz,
+    p_commits jsonb
+)
+returns table (id uuid, message text)
+language sql
+as $$
+    insert into public.commits (
+        user_id,
+        committed_at,
+        pushed_at,
+        commit_id,
+        message,
+        repository_id,
+        repository_name,
+        owner_name,
+        added_files,
+        removed_files,
+        modified_files
+    )
+    select
+        p_user_id,
+        c.committed_at,
+        p_pushed_at,
+        c.commit_id,
+        c.message,
+        p_repository_id,
+        p_repository_name,
+        p_owner_name,
+        c.added_files,
+        c.removed_files,
+        c.modified_files
+    from jsonb_to_recordset(p_commits) as c(
+        commit_id text,
+        message text,
+        committed_at timestamptz,
+        added_files text[],
+        removed_files text[],
+        modified_files text[]
+    );
+
+    select c.id, c.message
+    from public.commits c
+    where c.user_id = p_user_id
+      and c.repository_id = p_repository_id
+      and c.post_id is null
+    order by c.committed_at desc
+    limit 10;
+$$;
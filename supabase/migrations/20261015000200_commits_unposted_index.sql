@@ -0,0 +1,4 @@
+-- Serve process_github_push's "recent unposted commits" lookup from a small partial index.
+create index if not exists commits_unposted_idx
+    on public.commits (user_id, repository_id, committed_at desc)
+    where post_id is null;
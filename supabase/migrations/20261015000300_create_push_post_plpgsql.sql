@@ -0,0 +1,24 @@
+-- Redefine create_push_post in PL/pgSQL so its INSERT and UPDATE plans are
+-- prepared once per connection and reused, instead of re-planned on every call.
+create or replace function public.create_push_post(
+    p_author_id uuid,
+    p_description text,
+    p_commit_ids uuid[]
+)
+returns setof public.posts
+language plpgsql
+as $$
+declare
+    new_post public.posts;
+begin
+    insert into public.posts (author_id, description, type)
+    values (p_author_id, p_description, 'push')
+    returning * into new_post;
+
+    update public.commits
+    set post_id = new_post.id
+    where id = any(p_commit_ids);
+
+    return next new_post;
+end;
+$$;
@@ -0,0 +1,84 @@
+-- Make process_github_push idempotent so GitHub redeliveries don't duplicate
+-- commits or re-trigger a post evaluation.
+
+-- Drop existing duplicates before adding the constraint, keeping a row that
+-- is already linked to a post where there is one.
+delete from public.commits a
+using public.commits b
+where a.commit_id = b.commit_id
+  and a.repository_id = b.repository_id
+  and a.id <> b.id
+  and (
+      (a.post_id is null and b.post_id is not null)
+      or ((a.post_id is null) = (b.post_id is null) and a.id > b.id)
+  );
+
+alter table public.commits
+    add constraint commits_commit_id_repo_uniq unique (commit_id, repository_id);
+
+-- Skip commits that are already stored, and return no unposted commits when
+-- the push added nothing new (a redelivery), so the caller can stop early.
+create or replace function public.process_github_push(
+    p_user_id uuid,
+    p_repository_id text,
+    p_repository_name text,
+    p_owner_name text,
+    p_pushed_at timestamptz,
+    p_commits jsonb
+)
+returns table (id uuid, message text)
+language plpgsql
+as $$
+declare
+    inserted_count integer;
+begin
+    insert into public.commits (
+        user_id,
+        committed_at,
+        pushed_at,
+        commit_id,
+        message,
+        repository_id,
+        repository_name,
+        owner_name,
+        added_files,
+        removed_files,
+        modified_files
+    )
+    select
+        p_user_id,
+        c.committed_at,
+        p_pushed_at,
+        c.commit_id,
+        c.message,
+        p_repository_id,
+        p_repository_name,
+        p_owner_name,
+        c.added_files,
+        c.removed_files,
+        c.modified_files
+    from jsonb_to_recordset(p_commits) as c(
+        commit_id text,
+        message text,
+        committed_at timestamptz,
+        added_files text[],
+        removed_files text[],
+        modified_files text[]
+    )
+    on conflict (commit_id, repository_id) do nothing;
+
+    get diagnostics inserted_count = row_count;
+    if inserted_count = 0 then
+        return;
+    end if;
+
+    return query
+    select c.id, c.message
+    from public.commits c
+    where c.user_id = p_user_id
+      and c.repository_id = p_repository_id
+      and c.post_id is null
+    order by c.committed_at desc
+    limit 10;
+end;
+$$;
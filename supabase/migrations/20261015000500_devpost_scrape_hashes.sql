@@ -0,0 +1,11 @@
+-- Last imported Devpost scrape per user and portfolio, so process-devpost can
+-- skip the insert when a re-import finds nothing changed.
+create table if not exists public.devpost_scrape_hashes (
+    user_id uuid not null,
+    devpost_url text not null,
+    content_hash text not null,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, devpost_url)
+);
+
+alter table public.devpost_scrape_hashes enable row level security;